@@ -1,21 +1,27 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Request
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi import FastAPI, HTTPException, Request, BackgroundTasks
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
+import asyncio
 import os
-import io
 import uvicorn
 import pandas as pd
 import time
-from collections import defaultdict
+from typing import Dict, Tuple
 
-from app.models import DatasetProfile, BulkFixRequest, NaturalLanguageQuery, CleaningReport
+from app.models import DatasetProfile, BulkFixRequest, NaturalLanguageQuery, CleaningReport, SessionIssues, InsightReport
 from app.services.ingestion import IngestionService
 from app.services.profiler import ProfilerService
 from app.services.cleaner import CleanerService
 from app.services.nlp import NLPService
 from app.store import store
 
+# Copy-on-Write lets the services share frames and columns instead of deep-copying them.
+# It is always on from pandas 3.0, where the option is deprecated.
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
 app = FastAPI(title="Explain-Clean Tool")  # Renamed from AI
 
 # 1. CORS Restriction
@@ -40,25 +46,29 @@ app.add_middleware(
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# 2. Rate Limiting (Simple In-Memory Implementation)
+# 2. Rate Limiting (Simple In-Memory Token Bucket)
 # In production, use Redis.
 RATE_LIMIT_DURATION = 60  # seconds
 MAX_REQUESTS_PER_MINUTE = 20
-request_counts = defaultdict(list)
+REFILL_PER_SECOND = MAX_REQUESTS_PER_MINUTE / RATE_LIMIT_DURATION
+# client_ip -> (tokens left, last refill time); O(1) per request instead of rebuilding a timestamp list
+rate_buckets: Dict[str, Tuple[float, float]] = {}
 
 
 @app.middleware("http")
 async def rate_limit_middleware(request: Request, call_next):
     client_ip = request.client.host
-    now = time.time()
+    now = time.monotonic()
 
-    # Clean up old requests
-    request_counts[client_ip] = [t for t in request_counts[client_ip] if now - t < RATE_LIMIT_DURATION]
+    # Refill for the time elapsed since this client's last request, capped at a full minute's budget
+    tokens, last = rate_buckets.get(client_ip, (MAX_REQUESTS_PER_MINUTE, now))
+    tokens = min(MAX_REQUESTS_PER_MINUTE, tokens + (now - last) * REFILL_PER_SECOND)
 
-    if len(request_counts[client_ip]) >= MAX_REQUESTS_PER_MINUTE:
+    if tokens < 1:
+        rate_buckets[client_ip] = (tokens, now)
         return JSONResponse(status_code=429, content={"detail": "Rate limit exceeded. Please try again later."})
 
-    request_counts[client_ip].append(now)
+    rate_buckets[client_ip] = (tokens - 1, now)
     response = await call_next(request)
     return response
 
@@ -71,30 +81,30 @@ async def root():
 # 3. File Size & Type Validation
 MAX_FILE_SIZE = 100 * 1024 * 1024  # 100 MB limit
 
-
-@app.post("/api/upload", response_model=DatasetProfile)
-async def upload_dataset(file: UploadFile = File(...)):
-    # Validate File Type
-    if not file.filename.lower().endswith('.csv'):
-        raise HTTPException(status_code=400, detail="Invalid file type. Only CSV files are allowed.")
-
-    # Validate File Size (Approximation by reading chunk or seek)
-    # Since UploadFile is a SpooledTemporaryFile, we can check size.
-    file.file.seek(0, os.SEEK_END)
-    file_size = file.file.tell()
-    file.file.seek(0)  # Reset
-
-    if file_size > MAX_FILE_SIZE:
-        raise HTTPException(status_code=413,
-                            detail=f"File too large. Maximum size allowed is {MAX_FILE_SIZE / 1024 / 1024}MB.")
-
-    df = await IngestionService.process_upload(file)
-    session_id = store.create_session(df, file.filename)
-    issues = ProfilerService.analyze(df)
+UPLOAD_REQUEST_BODY = {
+    "required": True,
+    "content": {"multipart/form-data": {"schema": {
+        "type": "object",
+        "properties": {"file": {"type": "string", "format": "binary"}},
+        "required": ["file"],
+    }}},
+}
+
+
+@app.post("/api/upload", response_model=DatasetProfile, openapi_extra={"requestBody": UPLOAD_REQUEST_BODY})
+async def upload_dataset(request: Request):
+    # The multipart body is streamed and parsed by hand rather than through UploadFile,
+    # so the file is never written to a spooled temp file and read back.
+    # Type and size are validated while streaming.
+    filename, df = await IngestionService.process_stream(request, MAX_FILE_SIZE)
+    session_id = store.create_session(df, filename)
+    stats = {}
+    issues = ProfilerService.analyze(df, stats)
     store.save_issues(session_id, issues)
+    store.save_stats(session_id, stats)
 
     return DatasetProfile(
-        filename=file.filename,
+        filename=filename,
         total_rows=len(df),
         total_columns=len(df.columns),
         columns=df.columns.tolist(),
@@ -104,7 +114,7 @@ async def upload_dataset(file: UploadFile = File(...)):
     )
 
 
-@app.get("/api/session/{session_id}/analyze")
+@app.get("/api/session/{session_id}/analyze", response_model=InsightReport)
 async def analyze_session(session_id: str):
     session = store.get_session(session_id)
     if not session:
@@ -114,25 +124,26 @@ async def analyze_session(session_id: str):
 
 
 @app.post("/api/session/{session_id}/clean", response_model=CleaningReport)
-async def clean_dataset(session_id: str, request: BulkFixRequest):
+async def clean_dataset(session_id: str, request: BulkFixRequest, background: BackgroundTasks):
     session = store.get_session(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
     # 1. Apply Fixes
     original_df = session["current_df"]
+    # Cached statistics of untouched columns stay valid for the cleaned frame; the cleaner drops the rest
+    stats = dict(session["stats"])
     cleaned_df, actions = CleanerService.apply_fixes(
-        original_df, request.fixes, session["issues"]
+        original_df, request.fixes, session["issues"], stats
     )
 
     # 2. Update Session
-    store.update_dataframe(session_id, cleaned_df)
-    for action in actions:
-        store.log_action(session_id, action)
+    store.update_dataframe(session_id, cleaned_df, stats)
+    store.log_actions(session_id, actions)
 
     # 3. RE-PROFILE (Iterative Logic)
-    remaining_issues = ProfilerService.analyze(cleaned_df)
-    store.save_issues(session_id, remaining_issues)
+    # Runs after the response is sent; clients fetch the result from /issues?since=<profile_version>
+    background.add_task(reprofile_session, session_id, cleaned_df, dict(stats))
 
     # 4. Return Report
     download_url = f"/api/session/{session_id}/download"
@@ -141,33 +152,80 @@ async def clean_dataset(session_id: str, request: BulkFixRequest):
         rows_before=len(original_df),
         rows_after=len(cleaned_df),
         actions_taken=actions,
-        remaining_issues=remaining_issues,
+        remaining_issues=[],
         chart_recommendations=CleanerService.recommend_charts(cleaned_df),
-        download_url=download_url
+        download_url=download_url,
+        profile_version=session["profile_version"]
+    )
+
+
+async def reprofile_session(session_id: str, df: pd.DataFrame, stats: dict):
+    # Skip frames that a newer /clean has already replaced; that call schedules its own re-profile
+    session = store.get_session(session_id)
+    if not session or session["current_df"] is not df:
+        return
+    # A clean that changed nothing hands back the same frame, whose issues are already known
+    issues = store.cached_profile(session_id, df)
+    if issues is None:
+        # Only columns the clean touched are missing from `stats` and get their quartiles recomputed
+        issues = await run_in_threadpool(ProfilerService.analyze, df, stats)
+    if session["current_df"] is df:
+        store.save_issues(session_id, issues)
+        store.save_stats(session_id, stats)
+
+
+PROFILE_POLL_TIMEOUT = 30  # seconds
+
+
+@app.get("/api/session/{session_id}/issues", response_model=SessionIssues)
+async def get_session_issues(session_id: str, since: int = -1):
+    """
+    Returns the latest profile of the session's data. If it is not newer than
+    `since`, waits (up to PROFILE_POLL_TIMEOUT) for the background re-profile to land.
+    """
+    session = store.get_session(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    if session["profile_version"] <= since:
+        try:
+            await asyncio.wait_for(session["profile_ready"].wait(), timeout=PROFILE_POLL_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
+
+    return SessionIssues(
+        profile_version=session["profile_version"],
+        issues=list(session["issues"].values())
     )
 
 
 @app.get("/api/session/{session_id}/download")
-async def download_session_data(session_id: str):
+async def download_session_data(session_id: str, format: str = "csv"):
     """
-    Streams the current dataframe state from memory as a CSV download.
+    Streams the current dataframe state from memory as a CSV download,
+    or as a Snappy-compressed Parquet file with ?format=parquet.
     """
     session = store.get_session(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
+    if format not in ("csv", "parquet"):
+        raise HTTPException(status_code=400, detail="Invalid format. Use 'csv' or 'parquet'.")
 
     df = session["current_df"]
     filename = f"clean_{session['filename']}"
 
-    # Create an in-memory buffer
-    stream = io.StringIO()
-    df.to_csv(stream, index=False)
-
-    # Reset pointer to start of stream
-    stream.seek(0)
+    if format == "parquet":
+        # Parquet writes several times faster than CSV and keeps column types
+        filename = f"{os.path.splitext(filename)[0]}.parquet"
+        return Response(
+            content=IngestionService.to_parquet(df),
+            media_type="application/vnd.apache.parquet",
+            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        )
 
+    # CSV is produced chunk by chunk on the threadpool, so the socket drains while later rows serialize
     return StreamingResponse(
-        iter([stream.getvalue()]),
+        IngestionService.iter_csv(df),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from enum import Enum
 
@@ -36,7 +36,7 @@ class DatasetProfile(BaseModel):
     total_columns: int
     columns: List[str]
     issues: List[DetectedIssue]
-    sample_data: List[Dict[str, Any]]
+    sample_data: List[Dict[str, Any]] = Field(default_factory=list)
     session_id: str
 
 class FixRequest(BaseModel):
@@ -46,6 +46,11 @@ class FixRequest(BaseModel):
 class BulkFixRequest(BaseModel):
     fixes: List[FixRequest]
 
+class InsightReport(BaseModel):
+    insight: str
+    recommended_actions: List[FixRequest]
+    action_count: int
+
 class NaturalLanguageQuery(BaseModel):
     query: str
 
@@ -55,4 +60,9 @@ class CleaningReport(BaseModel):
     actions_taken: List[str]
     remaining_issues: List[DetectedIssue]
     chart_recommendations: List[str]
-    download_url: str
\ No newline at end of file
+    download_url: str
+    profile_version: int
+
+class SessionIssues(BaseModel):
+    profile_version: int
+    issues: List[DetectedIssue]
\ No newline at end of file
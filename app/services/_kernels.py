@@ -0,0 +1,79 @@
+import warnings
+import numpy as np
+import pandas as pd
+
+# Array kernels shared by the profiler and cleaner.
+# They work on plain float64 arrays and write into caller-provided buffers where possible,
+# so each fix makes one pass over the data instead of building pandas temporaries.
+
+SLAB_ROWS = 16_384  # Rows per slab in blocked reductions over 2-D arrays
+
+# Text accepted as a number by convert_numeric and the profiler's numbers-as-text check
+# (valid in both RE2, for pyarrow, and Python's re); anything else becomes NaN
+NUMERIC_PATTERN = r"^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$|^[+-]?(?i:inf|infinity)$"
+INTEGER_PATTERN = r"^[+-]?\d+$"
+
+
+def quartiles(arr: np.ndarray) -> tuple[float, float]:
+    # Both quartiles come out of a single selection pass over the column
+    q1, q3 = np.nanquantile(arr, [0.25, 0.75])
+    return float(q1), float(q3)
+
+
+def column_quartiles(block: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Quartiles of every column of a 2-D block in one call; all-NaN columns come out as NaN
+    if len(block) == 0:
+        empty = np.full(block.shape[1], np.nan)
+        return empty, empty.copy()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        q1, q3 = np.nanquantile(block, [0.25, 0.75], axis=0)
+    return q1, q3
+
+
+def iqr_bounds(q1: float, q3: float) -> tuple[float, float]:
+    iqr = q3 - q1
+    return q1 - 1.5 * iqr, q3 + 1.5 * iqr
+
+
+def clip_inplace(arr: np.ndarray, lower: float, upper: float) -> np.ndarray:
+    return np.clip(arr, lower, upper, out=arr)
+
+
+def outside_mask(arr: np.ndarray, lower, upper, out: np.ndarray | None = None,
+                 scratch: np.ndarray | None = None) -> np.ndarray:
+    # NaN compares False on both sides, so missing values are never flagged.
+    # Per-column bounds broadcast across the rows of a 2-D block.
+    # `out` and `scratch` are optional boolean buffers shaped like `arr`, reused across calls
+    mask = np.less(arr, lower, out=out)
+    np.logical_or(mask, np.greater(arr, upper, out=scratch), out=mask)
+    return mask
+
+
+def count_outliers(block: np.ndarray, lower: np.ndarray, upper: np.ndarray) -> np.ndarray:
+    # Per-column counts over row slabs, so the boolean mask stays cache-sized instead of spanning the block;
+    # the two slab masks are allocated once and refilled for every slab
+    counts = np.zeros(block.shape[1], dtype=np.int64)
+    mask = np.empty((min(len(block), SLAB_ROWS), block.shape[1]), dtype=bool)
+    scratch = np.empty_like(mask)
+    for start in range(0, len(block), SLAB_ROWS):
+        slab = block[start:start + SLAB_ROWS]
+        rows = len(slab)
+        counts += np.count_nonzero(outside_mask(slab, lower, upper, mask[:rows], scratch[:rows]), axis=0)
+    return counts
+
+
+def duplicated_rows(df: pd.DataFrame) -> np.ndarray:
+    # One uint64 hash per row, combined column by column over contiguous buffers,
+    # so duplicate detection runs on a single integer array instead of row tuples
+    if len(df.columns) == 0:
+        return df.duplicated().to_numpy()
+    # Object columns are hashed by their string form, so 1 and "1" would collide; mixed columns
+    # (and unhashable cell values like lists or dicts) need pandas' row-wise path
+    for col, dtype in df.dtypes.items():
+        if dtype == object and pd.api.types.infer_dtype(df[col], skipna=True) not in ("string", "empty"):
+            return df.duplicated().to_numpy()
+        if (isinstance(dtype, pd.CategoricalDtype) and dtype.categories.dtype == object
+                and pd.api.types.infer_dtype(dtype.categories) not in ("string", "empty")):
+            return df.duplicated().to_numpy()
+    return pd.util.hash_pandas_object(df, index=False).duplicated().to_numpy()
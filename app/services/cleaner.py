@@ -1,14 +1,27 @@
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 from app.models import CleaningReport, DetectedIssue
+from app.services._kernels import (quartiles, iqr_bounds, clip_inplace, outside_mask, duplicated_rows,
+                                   NUMERIC_PATTERN, INTEGER_PATTERN)
+
+
+# Strategies that remove rows; every other strategy rewrites a single column
+ROW_FILTERS = {"drop_rows", "remove_duplicates", "drop_outliers"}
 
 
 class CleanerService:
     @staticmethod
-    def apply_fixes(df: pd.DataFrame, fixes: list, issues_map: dict) -> tuple[pd.DataFrame, list]:
+    def apply_fixes(df: pd.DataFrame, fixes: list, issues_map: dict,
+                    stats: dict | None = None) -> tuple[pd.DataFrame, list]:
+        # stats: per-column statistics of `df` (see ProfilerService.analyze). Missing entries are
+        # filled in as they are computed, and entries are dropped as soon as the data behind them changes.
+        stats = {} if stats is None else stats
         audit_log = []
-        df_clean = df.copy()
 
+        # Fixes run in request order, grouped into runs of consecutive row filters or column rewrites
+        runs = []
         for fix in fixes:
             issue_id = fix.issue_id
             code = fix.strategy_code
@@ -20,82 +33,232 @@ class CleanerService:
             if not issue:
                 continue
 
-            col = issue.column
+            filters_rows = code in ROW_FILTERS
+            if not (filters_rows or issue.column):
+                continue
+            if runs and runs[-1][0] == filters_rows:
+                runs[-1][1].append((code, issue.column))
+            else:
+                runs.append((filters_rows, [(code, issue.column)]))
+
+        # A run that changes nothing hands back the same frame (the input itself if no fix applied),
+        # so callers can tell by identity that its profile is still valid
+        df_clean = df
+        for filters_rows, run in runs:
+            if filters_rows:
+                df_clean = CleanerService._filter_rows(df_clean, run, audit_log, stats)
+            else:
+                df_clean = CleanerService._rewrite_columns(df_clean, run, audit_log, stats)
 
+        return df_clean, audit_log
+
+    @staticmethod
+    def _filter_rows(df: pd.DataFrame, run: list, audit_log: list, stats: dict) -> pd.DataFrame:
+        # Consecutive row filters are combined into one mask and applied with a single indexing operation.
+        # Each filter only looks at the rows the earlier ones kept, as if they had been applied one by one.
+        keep = np.ones(len(df), dtype=bool)
+        for code, col in run:
             # Missing Values
             if code == "drop_rows":
                 if col:
-                    df_clean = df_clean.dropna(subset=[col])
+                    keep &= df[col].notna().to_numpy()
                     audit_log.append(f"Dropped rows with missing values in '{col}'")
-            elif code == "fill_mean":
-                val = df_clean[col].mean()
-                df_clean[col] = df_clean[col].fillna(val)
-                audit_log.append(f"Filled missing '{col}' with mean ({val:.2f})")
-            elif code == "fill_median":
-                val = df_clean[col].median()
-                df_clean[col] = df_clean[col].fillna(val)
-                audit_log.append(f"Filled missing '{col}' with median ({val:.2f})")
-            elif code == "fill_mode":
-                val = df_clean[col].mode()[0]
-                df_clean[col] = df_clean[col].fillna(val)
-                audit_log.append(f"Filled missing '{col}' with mode ({val})")
-            elif code == "fill_unknown":
-                df_clean[col] = df_clean[col].fillna("Unknown")
-                audit_log.append(f"Filled missing '{col}' with 'Unknown'")
-            elif code == "ffill":
-                df_clean[col] = df_clean[col].ffill()
-                audit_log.append(f"Forward-filled missing values in '{col}'")
 
             # Duplicates
             elif code == "remove_duplicates":
-                before = len(df_clean)
-                df_clean = df_clean.drop_duplicates()
-                audit_log.append(f"Removed {before - len(df_clean)} duplicate rows")
+                if keep.all():
+                    dupes = duplicated_rows(df)
+                else:
+                    dupes = np.zeros(len(df), dtype=bool)
+                    dupes[keep] = duplicated_rows(df[keep])
+                audit_log.append(f"Removed {np.count_nonzero(dupes)} duplicate rows")
+                keep &= ~dupes
 
             # Outliers
-            elif code == "clip_outliers":
-                Q1 = df_clean[col].quantile(0.25)
-                Q3 = df_clean[col].quantile(0.75)
-                IQR = Q3 - Q1
-                lower = Q1 - 1.5 * IQR
-                upper = Q3 + 1.5 * IQR
-                df_clean[col] = np.clip(df_clean[col], lower, upper)
-                audit_log.append(f"Clipped outliers in '{col}' to [{lower:.2f}, {upper:.2f}]")
             elif code == "drop_outliers":
-                Q1 = df_clean[col].quantile(0.25)
-                Q3 = df_clean[col].quantile(0.75)
-                IQR = Q3 - Q1
-                mask = ~((df_clean[col] < (Q1 - 1.5 * IQR)) | (df_clean[col] > (Q3 + 1.5 * IQR)))
-                df_clean = df_clean[mask]
+                arr = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+                if keep.all():
+                    lower, upper = CleanerService._iqr_bounds(arr, stats.setdefault(col, {}))
+                else:
+                    # Cached quartiles describe the unfiltered column
+                    lower, upper = CleanerService._iqr_bounds(arr[keep], {})
+                keep &= ~outside_mask(arr, lower, upper)
                 audit_log.append(f"Dropped outlier rows in '{col}'")
 
-            # Type & Text Issues
-            elif code == "convert_numeric":
-                df_clean[col] = pd.to_numeric(df_clean[col], errors='coerce')
-                audit_log.append(f"Converted '{col}' to Numeric (invalid values set to NaN)")
+        if keep.all():
+            return df
+        stats.clear()
+        return df[keep]
+
+    @staticmethod
+    def _rewrite_columns(df: pd.DataFrame, run: list, audit_log: list, stats: dict) -> pd.DataFrame:
+        # Each column is read once, run through its fixes in request order, and written back once
+        columns = {}
+        for code, col in run:
+            series = columns.get(col)
+            if series is None:
+                series = df[col]
+            columns[col] = CleanerService._fix_column(series, code, audit_log, stats.setdefault(col, {}))
+            stats.pop(col)
+
+        # Shallow copy: with Copy-on-Write, only the rewritten columns are materialized
+        df = df.copy(deep=False)
+        for col, series in columns.items():
+            df[col] = series
+        return df
 
-            elif code == "title_case":
-                df_clean[col] = df_clean[col].astype(str).str.title()
-                audit_log.append(f"Standardized '{col}' to Title Case")
+    @staticmethod
+    def _fix_column(series: pd.Series, code: str, audit_log: list, col_stats: dict) -> pd.Series:
+        col = series.name
 
-            elif code == "lower_case":
-                df_clean[col] = df_clean[col].astype(str).str.lower()
-                audit_log.append(f"Standardized '{col}' to Lower Case")
+        # Missing Values
+        if code == "fill_mean":
+            val = CleanerService._stat(col_stats, "mean", series.mean)
+            series = series.fillna(val)
+            audit_log.append(f"Filled missing '{col}' with mean ({val:.2f})")
+        elif code == "fill_median":
+            val = CleanerService._stat(col_stats, "median", series.median)
+            series = series.fillna(val)
+            audit_log.append(f"Filled missing '{col}' with median ({val:.2f})")
+        elif code == "fill_mode":
+            val = CleanerService._stat(col_stats, "mode", lambda: series.mode()[0])
+            series = series.fillna(val)
+            audit_log.append(f"Filled missing '{col}' with mode ({val})")
+        elif code == "fill_unknown":
+            if isinstance(series.dtype, pd.CategoricalDtype) and "Unknown" not in series.cat.categories:
+                series = series.cat.add_categories("Unknown")
+            series = series.fillna("Unknown")
+            audit_log.append(f"Filled missing '{col}' with 'Unknown'")
+        elif code == "ffill":
+            series = series.ffill()
+            audit_log.append(f"Forward-filled missing values in '{col}'")
 
-            # Viz Risks
-            elif code == "group_rare":
-                top_10 = df_clean[col].value_counts().nlargest(10).index
-                df_clean[col] = df_clean[col].apply(lambda x: x if x in top_10 else "Other")
-                audit_log.append(f"Grouped rare categories in '{col}' into 'Other'")
+        # Outliers
+        elif code == "clip_outliers":
+            arr = series.to_numpy(dtype=np.float64, na_value=np.nan, copy=True)
+            lower, upper = CleanerService._iqr_bounds(arr, col_stats)
+            series = pd.Series(clip_inplace(arr, lower, upper), index=series.index, name=col)
+            audit_log.append(f"Clipped outliers in '{col}' to [{lower:.2f}, {upper:.2f}]")
 
-        return df_clean, audit_log
+        # Type & Text Issues
+        elif code == "convert_numeric":
+            series = CleanerService._to_numeric(series)
+            audit_log.append(f"Converted '{col}' to Numeric (invalid values set to NaN)")
+
+        elif code == "title_case":
+            series = CleanerService._from_arrow(pc.utf8_title(CleanerService._arrow_strings(series)), series)
+            audit_log.append(f"Standardized '{col}' to Title Case")
+
+        elif code == "lower_case":
+            series = CleanerService._from_arrow(pc.utf8_lower(CleanerService._arrow_strings(series)), series)
+            audit_log.append(f"Standardized '{col}' to Lower Case")
+
+        # Viz Risks
+        elif code == "group_rare":
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                # Drop the rare categories instead of rewriting values; they become NaN, then "Other"
+                top_10 = series.cat.categories[CleanerService._top_codes(series.cat.codes.to_numpy(), 10)]
+                series = series.cat.remove_categories(series.cat.categories.difference(top_10))
+                if "Other" not in series.cat.categories:
+                    series = series.cat.add_categories("Other")
+                series = series.fillna("Other")
+            else:
+                series = series.where(CleanerService._top_values_mask(series, 10), "Other")
+            audit_log.append(f"Grouped rare categories in '{col}' into 'Other'")
+
+        return series
+
+    @staticmethod
+    def _stat(col_stats: dict, key: str, compute):
+        # Each statistic is computed at most once per version of the column
+        if key not in col_stats:
+            col_stats[key] = compute()
+        return col_stats[key]
+
+    @staticmethod
+    def _iqr_bounds(arr: np.ndarray, col_stats: dict) -> tuple[float, float]:
+        if "q1" not in col_stats:
+            col_stats["q1"], col_stats["q3"] = quartiles(arr)
+        return iqr_bounds(col_stats["q1"], col_stats["q3"])
+
+    @staticmethod
+    def _to_numeric(series: pd.Series) -> pd.Series:
+        if series.dtype.kind != "O":
+            return pd.to_numeric(series, errors='coerce')
+
+        # Validate every value with one regex kernel and cast in C++, rather than parsing value by value in Python
+        text = pc.utf8_trim_whitespace(CleanerService._arrow_strings(series))
+        valid = pc.match_substring_regex(text, NUMERIC_PATTERN)
+        candidate = pc.if_else(valid, text, pa.scalar(None, text.type))
+
+        # Fully valid whole-number columns become int64, as pd.to_numeric would return
+        values = None
+        if candidate.null_count == 0 and pc.all(pc.match_substring_regex(text, INTEGER_PATTERN)).as_py():
+            try:
+                values = pc.cast(candidate, pa.int64())
+            except pa.ArrowInvalid:
+                pass
+        if values is None:
+            values = pc.cast(candidate, pa.float64())
+        return pd.Series(values.to_numpy(zero_copy_only=False), index=series.index, name=series.name)
+
+    @staticmethod
+    def _top_codes(codes: np.ndarray, k: int) -> np.ndarray:
+        # Categorical codes are counted with bincount and partially selected; no values are hashed
+        counts = np.bincount(codes[codes >= 0])
+        if len(counts) <= k:
+            return np.flatnonzero(counts)
+        return np.argpartition(counts, -k)[-k:]
+
+    @staticmethod
+    def _top_values_mask(series: pd.Series, k: int) -> np.ndarray:
+        # Count in Arrow and partially select the k most frequent values, instead of sorting every count,
+        # then test membership with Arrow's hash kernel on the same buffers
+        try:
+            arr = pa.array(series, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Mixed-type object columns: nlargest is still a partial selection over pandas' unsorted counts
+            return series.isin(series.value_counts(sort=False).nlargest(k).index).to_numpy()
+        counts = pc.value_counts(pc.drop_null(arr))
+        counts = pa.table({"values": counts.field("values"), "counts": counts.field("counts")})
+        top = pc.select_k_unstable(counts, k=k, sort_keys=[("counts", "descending")])
+        top_values = counts.column("values").take(top).combine_chunks()
+        return pc.is_in(arr, value_set=top_values).to_numpy(zero_copy_only=False)
+
+    @staticmethod
+    def _arrow_strings(series: pd.Series) -> pa.Array:
+        # Text columns convert without copying when already Arrow-backed; categoricals are decoded
+        try:
+            arr = pa.array(series, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            arr = None
+        if arr is not None and pa.types.is_dictionary(arr.type):
+            arr = arr.dictionary_decode()
+        if arr is None or not (pa.types.is_string(arr.type) or pa.types.is_large_string(arr.type)):
+            # Numbers or mixed values are stringified one by one, as astype(str) did; nulls stay null
+            arr = pa.array(series.astype(object).map(str, na_action='ignore'), type=pa.large_string(),
+                           from_pandas=True)
+        return arr
+
+    @staticmethod
+    def _from_arrow(arr: pa.Array, like: pd.Series) -> pd.Series:
+        series = arr.to_pandas()
+        series.index = like.index
+        series.name = like.name
+        return series
 
     @staticmethod
     def recommend_charts(df: pd.DataFrame) -> list[str]:
         recommendations = []
-        num_cols = df.select_dtypes(include=[np.number]).columns.tolist()
-        cat_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
-        date_cols = df.select_dtypes(include=['datetime']).columns.tolist()
+        # One pass over the dtypes instead of three select_dtypes scans
+        num_cols, cat_cols, date_cols = [], [], []
+        for col, dtype in df.dtypes.items():
+            if dtype.kind in "iufc":
+                num_cols.append(col)
+            elif dtype == object or isinstance(dtype, (pd.CategoricalDtype, pd.StringDtype)):
+                cat_cols.append(col)
+            elif dtype.kind == "M":
+                date_cols.append(col)
 
         if len(num_cols) >= 2:
             recommendations.append(f"Scatter Plot: {num_cols[0]} vs {num_cols[1]}")
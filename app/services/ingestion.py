@@ -1,32 +1,206 @@
+from typing import Iterator
 import pandas as pd
-from fastapi import UploadFile
-import io
+from pandas._libs.parsers import STR_NA_VALUES
+import pyarrow as pa
+from pyarrow import csv as pa_csv
+from fastapi import HTTPException, Request
+from python_multipart import MultipartParser
+from python_multipart.multipart import parse_options_header
 
 MAX_ROWS_FOR_FULL_PROFILE = 100000
+CSV_BLOCK_SIZE = 8 << 20  # 8 MB blocks for Arrow's multithreaded parser
+CSV_CHUNK_ROWS = 50_000  # Rows serialized per chunk of a streamed CSV download
+MULTIPART_OVERHEAD = 16 * 1024  # Boundaries and part headers around the file body
+CATEGORY_MAX_RATIO = 0.5  # Text columns with fewer distinct values than this share of rows...
+CATEGORY_MAX_UNIQUE = 10_000  # ...and fewer than this many are ingested as categories
+CSV_NULL_VALUES = sorted(STR_NA_VALUES)  # pandas.read_csv's default NA markers, so both parsers agree on nulls
+
+
+class _CsvUploadParser:
+    """Multipart callbacks that copy the first file part straight into an Arrow buffer."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.filename = None
+        self.sink = pa.BufferOutputStream()
+        self._size = 0
+        self._in_file = False
+        self._header_field = b""
+        self._header_value = b""
+        self._disposition = b""
+
+    def on_part_begin(self):
+        self._disposition = b""
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        if self._header_field.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        # Only the first file part is kept; other form fields are skipped
+        self._in_file = self.filename is None and b"filename" in options
+        if self._in_file:
+            self.filename = options[b"filename"].decode("utf-8", errors="replace")
+            # Validate File Type
+            if not self.filename.lower().endswith('.csv'):
+                raise HTTPException(status_code=400, detail="Invalid file type. Only CSV files are allowed.")
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if not self._in_file:
+            return
+        self._size += end - start
+        if self._size > self.max_size:
+            raise _file_too_large(self.max_size)
+        self.sink.write(data[start:end])
+
+    def on_part_end(self):
+        self._in_file = False
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+
+def _file_too_large(max_size: int) -> HTTPException:
+    return HTTPException(status_code=413,
+                         detail=f"File too large. Maximum size allowed is {max_size / 1024 / 1024}MB.")
 
 
 class IngestionService:
     @staticmethod
-    async def process_upload(file: UploadFile) -> pd.DataFrame:
-        content = await file.read()
+    async def process_stream(request: Request, max_size: int) -> tuple[str, pd.DataFrame]:
+        # Reject oversized bodies up front; the running count below catches chunked uploads
+        content_length = request.headers.get("content-length")
+        if content_length and int(content_length) > max_size + MULTIPART_OVERHEAD:
+            raise _file_too_large(max_size)
+
+        _, params = parse_options_header(request.headers.get("content-type"))
+        if b"boundary" not in params:
+            raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload.")
+
+        # Body chunks go from the socket into one Arrow buffer, with no spooled temp file in between
+        upload = _CsvUploadParser(max_size)
+        parser = MultipartParser(params[b"boundary"], upload.callbacks())
+        async for chunk in request.stream():
+            parser.write(chunk)
+        parser.finalize()
+
+        if upload.filename is None:
+            raise HTTPException(status_code=400, detail="No file uploaded.")
 
         # Determine file type and read
         # Simple implementation supports CSV. Extendable for Parquet/Excel.
-        try:
-            # Try reading full file
-            df = pd.read_csv(io.BytesIO(content))
-        except Exception:
-            # Fallback for encoding issues
-            df = pd.read_csv(io.BytesIO(content), encoding='latin1')
+        df = IngestionService._read_csv(pa.BufferReader(upload.sink.getvalue()))
 
         # Check size constraint
         if len(df) > MAX_ROWS_FOR_FULL_PROFILE:
             # Random sample for profiling massive datasets
             df = df.sample(n=MAX_ROWS_FOR_FULL_PROFILE, random_state=42)
 
-        return df
+        return upload.filename, IngestionService._to_categories(df)
+
+    @staticmethod
+    def _to_categories(df: pd.DataFrame) -> pd.DataFrame:
+        # Low-cardinality text columns are stored as categories: one copy of each distinct string
+        # plus integer codes, which the profiler and cleaner work on directly
+        text_cols = [col for col, dtype in df.dtypes.items() if dtype == object or isinstance(dtype, pd.StringDtype)]
+        if not text_cols or df.empty:
+            return df
+        uniques = df[text_cols].nunique()
+        low = [col for col in text_cols
+               if uniques[col] < CATEGORY_MAX_UNIQUE and uniques[col] < CATEGORY_MAX_RATIO * len(df)]
+        return df.astype({col: "category" for col in low}) if low else df
+
+    @staticmethod
+    def _read_csv(source) -> pd.DataFrame:
+        for encoding in ("utf8", "latin1"):
+            source.seek(0)
+            read_options = pa_csv.ReadOptions(block_size=CSV_BLOCK_SIZE, use_threads=True, encoding=encoding)
+            try:
+                convert_options = IngestionService._convert_options(source, read_options)
+                table = pa_csv.read_csv(source, read_options=read_options, convert_options=convert_options)
+            except pa.ArrowInvalid:
+                break
+            # Arrow keeps undecodable text as binary columns; fallback for encoding issues
+            if encoding == "utf8" and any(pa.types.is_binary(t) for t in table.schema.types):
+                continue
+            # Arrow keeps repeated header names as they are; pandas renames them (a, a.1, ...)
+            if len(set(table.column_names)) < table.num_columns:
+                break
+            # Columns with no values at all come out of Arrow as `null`; pandas reads them as float64
+            if any(pa.types.is_null(t) for t in table.schema.types):
+                table = table.cast(pa.schema([field.with_type(pa.float64()) if pa.types.is_null(field.type) else field
+                                              for field in table.schema]))
+            return table.to_pandas(self_destruct=True, split_blocks=True)
+
+        # Arrow infers types from the first block only; let pandas handle files whose types drift later on,
+        # and files with repeated column names
+        source.seek(0)
+        try:
+            return pd.read_csv(source)
+        except Exception:
+            source.seek(0)
+            return pd.read_csv(source, encoding='latin1')
+
+    @staticmethod
+    def _convert_options(source, read_options: pa_csv.ReadOptions) -> pa_csv.ConvertOptions:
+        # Arrow parses ISO dates and timestamps, while pandas.read_csv (and the profiler's text checks)
+        # keep them as written. Sniff the first block's inferred schema and read those columns as text.
+        reader = pa_csv.open_csv(source, read_options=read_options,
+                                 convert_options=pa_csv.ConvertOptions(null_values=CSV_NULL_VALUES,
+                                                                      strings_can_be_null=True))
+        temporal = {field.name: pa.string() for field in reader.schema if pa.types.is_temporal(field.type)}
+        source.seek(0)
+        return pa_csv.ConvertOptions(null_values=CSV_NULL_VALUES, strings_can_be_null=True,
+                                     column_types=temporal)
+
+    @staticmethod
+    def iter_csv(df: pd.DataFrame) -> Iterator[str | bytes]:
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, ValueError):
+            # Mixed-type object columns or duplicate names: fall back to pandas' writer
+            yield df.head(0).to_csv(index=False)
+            for start in range(0, len(df), CSV_CHUNK_ROWS):
+                yield df.iloc[start:start + CSV_CHUNK_ROWS].to_csv(index=False, header=False)
+            return
+
+        # Arrow's C++ writer serializes whole columns at a time; slices share the table's buffers.
+        # The first chunk carries the header, so an empty frame still downloads as a valid CSV
+        for start in range(0, max(table.num_rows, 1), CSV_CHUNK_ROWS):
+            sink = pa.BufferOutputStream()
+            pa_csv.write_csv(table.slice(start, CSV_CHUNK_ROWS), sink,
+                             write_options=pa_csv.WriteOptions(include_header=start == 0, quoting_style="needed"))
+            yield sink.getvalue().to_pybytes()
+
+    @staticmethod
+    def to_parquet(df: pd.DataFrame) -> bytes:
+        try:
+            return df.to_parquet(engine="pyarrow", compression="snappy", index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Object columns mixing numbers and text (e.g. after grouping into 'Other') are stored as text
+            mixed = df.select_dtypes(include=['object']).columns
+            as_text = df.assign(**{col: df[col].map(str, na_action='ignore') for col in mixed})
+            return as_text.to_parquet(engine="pyarrow", compression="snappy", index=False)
 
     @staticmethod
     def get_preview(df: pd.DataFrame, rows=5):
-        # Handle NaN for JSON serialization
-        return df.head(rows).replace({float('nan'): None}).to_dict(orient='records')
\ No newline at end of file
+        # Handle NaN/NaT/NA for JSON serialization with a single null mask over the preview rows
+        head = df.head(rows)
+        return head.astype(object).where(head.notna(), None).to_dict(orient='records')
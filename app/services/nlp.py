@@ -1,65 +1,80 @@
 from typing import List, Tuple, Dict, Any
-from app.models import DetectedIssue, IssueType
+import re
+from app.models import DetectedIssue, IssueType, Severity
+
+# Command keyword -> intent
+INTENT_KEYWORDS = {
+    "high": "high", "critical": "high", "severe": "high",
+    "missing": "missing", "null": "missing", "empty": "missing",
+    "text": "text", "case": "text",
+    "type": "type", "number": "type",
+    "chart": "viz", "viz": "viz", "bar": "viz",
+    "all": "all", "everything": "all",
+}
+# Every keyword as a whole word (plurals included), found in a single scan of the command
+INTENT_RE = re.compile(r"\b(" + "|".join(INTENT_KEYWORDS) + r")s?\b")
+# When a command mentions several intents, the first one listed here wins
+INTENT_PRIORITY = ("high", "missing", "text", "type", "viz", "all")
+# Issue types whose default strategy does not depend on the issue itself
+TYPE_DEFAULT_STRATEGIES = {
+    IssueType.DUPLICATES: "remove_duplicates",
+    IssueType.OUTLIERS: "clip_outliers",
+    IssueType.VISUALIZATION_RISK: "group_rare",
+    IssueType.INCONSISTENT_TYPE: "convert_numeric",
+    IssueType.TEXT_INCONSISTENCY: "title_case",
+}
+# Intent -> (which issues it selects, fixed strategy or None for each issue's default)
+INTENT_RULES = {
+    "high": (lambda issue: issue.severity is Severity.HIGH, None),
+    "missing": (lambda issue: issue.type is IssueType.MISSING_VALUES, None),
+    "text": (lambda issue: issue.type is IssueType.TEXT_INCONSISTENCY, "title_case"),
+    "type": (lambda issue: issue.type is IssueType.INCONSISTENT_TYPE, "convert_numeric"),
+    "viz": (lambda issue: issue.type is IssueType.VISUALIZATION_RISK, "group_rare"),
+    "all": (lambda issue: True, None),
+}
 
 
 class NLPService:
     @staticmethod
     def interpret_command(command: str, issues: List[DetectedIssue]) -> List[Tuple[str, str]]:
-        command = command.lower()
-        actions = []
-
-        if "high" in command or "critical" in command:
-            for issue in issues:
-                if issue.severity == "High":
-                    strategy = NLPService._get_default_strategy(issue)
-                    if strategy: actions.append((issue.id, strategy))
-
-        elif "missing" in command:
-            for issue in issues:
-                if issue.type == IssueType.MISSING_VALUES:
-                    strategy = NLPService._get_default_strategy(issue)
-                    if strategy: actions.append((issue.id, strategy))
-
-        elif "text" in command or "case" in command:
-            for issue in issues:
-                if issue.type == IssueType.TEXT_INCONSISTENCY:
-                    actions.append((issue.id, "title_case"))
-
-        elif "type" in command or "number" in command:
-            for issue in issues:
-                if issue.type == IssueType.INCONSISTENT_TYPE:
-                    actions.append((issue.id, "convert_numeric"))
+        intents = {INTENT_KEYWORDS[keyword] for keyword in INTENT_RE.findall(command.lower())}
+        for intent in INTENT_PRIORITY:
+            if intent in intents:
+                matches, strategy = INTENT_RULES[intent]
+                return NLPService._collect(issues, matches, strategy)
+        return []
 
-        elif "all" in command or "everything" in command:
-            for issue in issues:
-                strategy = NLPService._get_default_strategy(issue)
-                if strategy: actions.append((issue.id, strategy))
-
-        return actions
+    @staticmethod
+    def _collect(issues: List[DetectedIssue], matches, strategy: str | None) -> List[Tuple[str, str]]:
+        # A fixed strategy applies to every matching issue; otherwise each issue gets its default
+        if strategy:
+            return [(issue.id, strategy) for issue in issues if matches(issue)]
+        return [(issue.id, default) for issue in issues
+                if matches(issue) and (default := NLPService._get_default_strategy(issue))]
 
     @staticmethod
     def generate_insight(issues: List[DetectedIssue]) -> Dict[str, Any]:
-        high_sev = [i for i in issues if i.severity == "High"]
-        insight_text = ""
-        actions = []
+        high_sev = [i for i in issues if i.severity is Severity.HIGH]
+        # Sentences are collected and joined once rather than concatenated one by one
+        parts: list[str] = []
 
         if not issues:
-            insight_text = "Great news! The dataset appears to be clean. No major issues were detected."
+            parts.append("Great news! The dataset appears to be clean. No major issues were detected.")
         else:
-            insight_text = f"I have analyzed your data and found {len(issues)} quality issues. "
+            parts.append(f"I have analyzed your data and found {len(issues)} quality issues.")
             if high_sev:
-                insight_text += f"Most critically, there are {len(high_sev)} high-severity issues. "
-                if any(i.type == IssueType.INCONSISTENT_TYPE for i in high_sev):
-                    insight_text += "Some columns look like numbers but are stored as text. "
-                if any(i.type == IssueType.DUPLICATES for i in high_sev):
-                    insight_text += "There are also duplicate rows found. "
+                parts.append(f"Most critically, there are {len(high_sev)} high-severity issues.")
+                high_types = {i.type for i in high_sev}
+                if IssueType.INCONSISTENT_TYPE in high_types:
+                    parts.append("Some columns look like numbers but are stored as text.")
+                if IssueType.DUPLICATES in high_types:
+                    parts.append("There are also duplicate rows found.")
 
-            insight_text += "I've created a custom cleaning plan to standardize these values."
+            parts.append("I've created a custom cleaning plan to standardize these values.")
+        insight_text = " ".join(parts)
 
-        for issue in issues:
-            strategy = NLPService._get_default_strategy(issue)
-            if strategy and strategy != "ignore":
-                actions.append({"issue_id": issue.id, "strategy_code": strategy})
+        actions = [{"issue_id": issue.id, "strategy_code": strategy} for issue in issues
+                   if (strategy := NLPService._get_default_strategy(issue)) and strategy != "ignore"]
 
         return {
             "insight": insight_text,
@@ -69,19 +84,18 @@ class NLPService:
 
     @staticmethod
     def _get_default_strategy(issue: DetectedIssue) -> str:
-        if issue.type == IssueType.DUPLICATES:
-            return "remove_duplicates"
-        if issue.type == IssueType.MISSING_VALUES:
-            if issue.row_count < 20 or issue.row_count / 1000 < 0.05: return "drop_rows"
-            if issue.column and ("date" in issue.column.lower() or "time" in issue.column.lower()): return "ffill"
-            if "Numeric" in str(issue.description): return "fill_median"
-            return "fill_mode"
-        if issue.type == IssueType.OUTLIERS:
-            return "clip_outliers"
-        if issue.type == IssueType.VISUALIZATION_RISK:
-            return "group_rare"
-        if issue.type == IssueType.INCONSISTENT_TYPE:
-            return "convert_numeric"
-        if issue.type == IssueType.TEXT_INCONSISTENCY:
-            return "title_case"
-        return "ignore"
\ No newline at end of file
+        # Only missing values need per-issue dispatch; every other type has a fixed default
+        if issue.type is not IssueType.MISSING_VALUES:
+            return TYPE_DEFAULT_STRATEGIES.get(issue.type, "ignore")
+        return NLPService._missing_strategy(issue)
+
+    @staticmethod
+    def _missing_strategy(issue: DetectedIssue) -> str:
+        if issue.row_count < 20 or issue.row_count / 1000 < 0.05:
+            return "drop_rows"
+        col_lower = issue.column.lower() if issue.column else ""
+        if "date" in col_lower or "time" in col_lower:
+            return "ffill"
+        if "Numeric" in issue.description:
+            return "fill_median"
+        return "fill_mode"
@@ -1,151 +1,230 @@
 import pandas as pd
 import numpy as np
-import uuid
+import itertools
+import re
 from app.models import DetectedIssue, IssueType, Severity, ResolutionStrategy
+from app.services._kernels import column_quartiles, count_outliers, duplicated_rows, NUMERIC_PATTERN
+
+# Sampling pre-check for the numbers-as-text scan. The sample only rejects columns; the final
+# decision is always made on the full column. The bar sits well below the 80% rule so that
+# sampling noise does not hide a qualifying column.
+NUMERIC_RE = re.compile(NUMERIC_PATTERN)
+NUMERIC_SAMPLE_SIZE = 200
+NUMERIC_SAMPLE_MIN_SHARE = 0.5
+
+# Upper bound on the float64 copy of numeric columns made for the outlier check
+OUTLIER_BLOCK_BYTES = 256 * 1024 * 1024
+
+# Identifier-like numeric columns are not checked for outliers
+ID_COLUMN_RE = re.compile(r"id|key|code", re.IGNORECASE)
+
+# Issue ids only need to be unique within the process (sessions are in-memory), so a counter
+# replaces uuid4's urandom read; next() on itertools.count is atomic, so threadpool re-profiles are safe
+_issue_seq = itertools.count(1)
+
+
+def _new_issue_id() -> str:
+    return f"iss_{next(_issue_seq)}"
+
+
+# Strategy menus are identical for every issue of a kind, so they are built once and shared
+MV_NUMERIC_STRATEGIES = (
+    ResolutionStrategy(name="Drop Rows", description="Remove rows with missing values", action_code="drop_rows"),
+    ResolutionStrategy(name="Fill with Median", description="Robust fill for skewed data", action_code="fill_median"),
+    ResolutionStrategy(name="Fill with Mean", description="Standard fill for normal data", action_code="fill_mean"),
+    ResolutionStrategy(name="Forward Fill", description="Propagate last valid observation", action_code="ffill"),
+    ResolutionStrategy(name="Ignore", description="Keep data as is", action_code="ignore"),
+)
+MV_OBJECT_STRATEGIES = (
+    ResolutionStrategy(name="Drop Rows", description="Remove rows with missing values", action_code="drop_rows"),
+    ResolutionStrategy(name="Fill with Mode", description="Replace with most frequent value", action_code="fill_mode"),
+    ResolutionStrategy(name="Fill 'Unknown'", description="Explicitly label as Unknown", action_code="fill_unknown"),
+    ResolutionStrategy(name="Ignore", description="Keep data as is", action_code="ignore"),
+)
+DUP_STRATEGIES = (
+    ResolutionStrategy(name="Remove Duplicates", description="Keep only the first occurrence",
+                       action_code="remove_duplicates"),
+    ResolutionStrategy(name="Ignore", description="Keep duplicates", action_code="ignore"),
+)
+OUTLIER_STRATEGIES = (
+    ResolutionStrategy(name="Clip Values", description="Cap values at min/max thresholds", action_code="clip_outliers"),
+    ResolutionStrategy(name="Remove Rows", description="Delete rows with outliers", action_code="drop_outliers"),
+    ResolutionStrategy(name="Ignore", description="Keep actual values", action_code="ignore"),
+)
+TYPE_STRATEGIES = (
+    ResolutionStrategy(name="Convert to Numeric", description="Force conversion (text becomes NaN)",
+                       action_code="convert_numeric"),
+    ResolutionStrategy(name="Ignore", description="Keep as text", action_code="ignore"),
+)
+TEXT_STRATEGIES = (
+    ResolutionStrategy(name="Standardize (Title Case)", description="Convert to 'Title Case'", action_code="title_case"),
+    ResolutionStrategy(name="Standardize (Lower Case)", description="Convert to 'lower case'", action_code="lower_case"),
+    ResolutionStrategy(name="Ignore", description="Keep as is", action_code="ignore"),
+)
 
 
 class ProfilerService:
     @staticmethod
-    def analyze(df: pd.DataFrame) -> list[DetectedIssue]:
+    def analyze(df: pd.DataFrame, stats: dict | None = None) -> list[DetectedIssue]:
+        # stats: optional per-column statistics cache for `df` ({col: {"q1": ..., "q3": ...}}).
+        # Cached quartiles are reused, and the ones computed here are added for the cleaner.
+        stats = {} if stats is None else stats
+        # No rows or no columns: nothing can be missing, duplicated or out of range
+        if df.empty:
+            return []
+        # Issues are built with model_construct: every field is already of its declared type, so validation is skipped
         issues = []
+        n = len(df)
 
         # 1. Missing Values
-        missing = df.isnull().sum()
-        for col, count in missing.items():
+        # Non-null counts come from one block-wise reduction, without materializing a boolean frame;
+        # one dtype pass replaces a dtype check per column
+        missing = n - df.count().to_numpy()
+        numeric = [dtype.kind in "biufc" for dtype in df.dtypes]
+        for col, count, is_numeric in zip(df.columns, missing, numeric):
             if count > 0:
-                pct = (count / len(df)) * 100
+                pct = (count / n) * 100
                 severity = Severity.HIGH if pct > 20 else Severity.MEDIUM
 
-                strategies = [
-                    ResolutionStrategy(name="Drop Rows", description="Remove rows with missing values",
-                                       action_code="drop_rows"),
-                    ResolutionStrategy(name="Ignore", description="Keep data as is", action_code="ignore")
-                ]
-
                 # Context-Aware Strategies
-                if pd.api.types.is_numeric_dtype(df[col]):
-                    strategies.insert(1, ResolutionStrategy(name="Fill with Median",
-                                                            description="Robust fill for skewed data",
-                                                            action_code="fill_median"))
-                    strategies.insert(2, ResolutionStrategy(name="Fill with Mean",
-                                                            description="Standard fill for normal data",
-                                                            action_code="fill_mean"))
-                    strategies.insert(3, ResolutionStrategy(name="Forward Fill",
-                                                            description="Propagate last valid observation",
-                                                            action_code="ffill"))
-                else:
-                    strategies.insert(1, ResolutionStrategy(name="Fill with Mode",
-                                                            description="Replace with most frequent value",
-                                                            action_code="fill_mode"))
-                    strategies.insert(2, ResolutionStrategy(name="Fill 'Unknown'",
-                                                            description="Explicitly label as Unknown",
-                                                            action_code="fill_unknown"))
-
-                issues.append(DetectedIssue(
-                    id=str(uuid.uuid4()),
+                strategies = MV_NUMERIC_STRATEGIES if is_numeric else MV_OBJECT_STRATEGIES
+
+                issues.append(DetectedIssue.model_construct(
+                    id=_new_issue_id(),
                     type=IssueType.MISSING_VALUES,
                     column=col,
                     description=f"Column '{col}' has {count} missing values ({pct:.1f}%).",
                     severity=severity,
                     impact="Missing data causes errors in aggregation and voids chart rendering.",
                     row_count=int(count),
-                    strategies=strategies
+                    strategies=list(strategies)
                 ))
 
         # 2. Duplicates
-        dupes = df.duplicated().sum()
-        if dupes > 0:
-            issues.append(DetectedIssue(
-                id=str(uuid.uuid4()),
+        # Same hashed check the cleaner uses; rows are only counted once any duplicate is found
+        dup_mask = duplicated_rows(df)
+        if dup_mask.any():
+            dupes = np.count_nonzero(dup_mask)
+            issues.append(DetectedIssue.model_construct(
+                id=_new_issue_id(),
                 type=IssueType.DUPLICATES,
                 column=None,
                 description=f"Dataset contains {dupes} exact duplicate rows.",
                 severity=Severity.HIGH,
                 impact="Duplicates artificially inflate counts and bias statistical models.",
                 row_count=int(dupes),
-                strategies=[
-                    ResolutionStrategy(name="Remove Duplicates", description="Keep only the first occurrence",
-                                       action_code="remove_duplicates"),
-                    ResolutionStrategy(name="Ignore", description="Keep duplicates", action_code="ignore")
-                ]
+                strategies=list(DUP_STRATEGIES)
             ))
 
         # 3. Numeric Outliers (Skipping IDs)
-        numeric_cols = df.select_dtypes(include=[np.number]).columns
-        for col in numeric_cols:
-            if "id" in col.lower() or "key" in col.lower() or "code" in col.lower():
+        numeric_cols = [col for col in df.select_dtypes(include=[np.number]).columns if not ID_COLUMN_RE.search(col)]
+        if numeric_cols:
+            outlier_counts = ProfilerService._outlier_counts(df, numeric_cols, stats)
+            for col, outliers in zip(numeric_cols, outlier_counts):
+                if outliers > 0:
+                    pct = (outliers / n) * 100
+                    if 0 < pct < 15:
+                        issues.append(DetectedIssue.model_construct(
+                            id=_new_issue_id(),
+                            type=IssueType.OUTLIERS,
+                            column=col,
+                            description=f"Column '{col}' has {outliers} outliers.",
+                            severity=Severity.MEDIUM,
+                            impact="Outliers skew averages and distort visualizations.",
+                            row_count=int(outliers),
+                            strategies=list(OUTLIER_STRATEGIES)
+                        ))
+
+        # 4 & 5. Text columns are visited once for both the type and the casing check.
+        # Type issues are still reported ahead of casing issues.
+        # Columns come straight from items(), and their null counts from step 1
+        text_issues = []
+        for (col, series), count in zip(df.items(), missing):
+            dtype = series.dtype
+            if not (dtype == object or isinstance(dtype, (pd.CategoricalDtype, pd.StringDtype))):
                 continue
 
-            Q1 = df[col].quantile(0.25)
-            Q3 = df[col].quantile(0.75)
-            IQR = Q3 - Q1
-            outliers = ((df[col] < (Q1 - 1.5 * IQR)) | (df[col] > (Q3 + 1.5 * IQR))).sum()
-
-            if outliers > 0:
-                pct = (outliers / len(df)) * 100
-                if 0 < pct < 15:
-                    issues.append(DetectedIssue(
-                        id=str(uuid.uuid4()),
-                        type=IssueType.OUTLIERS,
+            # 4. Inconsistent Types (Numbers as Strings)
+            # Cheap rejects before the full conversion: nulls never convert, so a column with 20%+ of them
+            # cannot qualify; and a spread-out sample that is mostly non-numeric rules out free text
+            if n - count > 0.8 * n and ProfilerService._sample_looks_numeric(series):
+                if isinstance(series.dtype, pd.CategoricalDtype):
+                    # Each category is converted once; rows are counted through their codes
+                    valid = pd.to_numeric(series.cat.categories, errors='coerce').notna()
+                    codes = series.cat.codes.to_numpy()
+                    num_valid = np.count_nonzero(valid[codes[codes >= 0]])
+                else:
+                    numeric_conversion = pd.to_numeric(series, errors='coerce')
+                    num_valid = np.count_nonzero(numeric_conversion.notna().to_numpy())
+
+                # If >80% are numbers but column is Object
+                if num_valid > 0.8 * n and num_valid < n:
+                    issues.append(DetectedIssue.model_construct(
+                        id=_new_issue_id(),
+                        type=IssueType.INCONSISTENT_TYPE,
                         column=col,
-                        description=f"Column '{col}' has {outliers} outliers.",
-                        severity=Severity.MEDIUM,
-                        impact="Outliers skew averages and distort visualizations.",
-                        row_count=int(outliers),
-                        strategies=[
-                            ResolutionStrategy(name="Clip Values", description="Cap values at min/max thresholds",
-                                               action_code="clip_outliers"),
-                            ResolutionStrategy(name="Remove Rows", description="Delete rows with outliers",
-                                               action_code="drop_outliers"),
-                            ResolutionStrategy(name="Ignore", description="Keep actual values", action_code="ignore")
-                        ]
+                        description=f"Column '{col}' looks numeric but contains text/garbage.",
+                        severity=Severity.HIGH,
+                        impact="Prevents mathematical operations and sorting.",
+                        row_count=n,
+                        strategies=list(TYPE_STRATEGIES)
                     ))
 
-        # 4. Inconsistent Types (Numbers as Strings)
-        object_cols = df.select_dtypes(include=['object']).columns
-        for col in object_cols:
-            numeric_conversion = pd.to_numeric(df[col], errors='coerce')
-            num_valid = numeric_conversion.notna().sum()
-
-            # If >80% are numbers but column is Object
-            if num_valid > 0.8 * len(df) and num_valid < len(df):
-                issues.append(DetectedIssue(
-                    id=str(uuid.uuid4()),
-                    type=IssueType.INCONSISTENT_TYPE,
-                    column=col,
-                    description=f"Column '{col}' looks numeric but contains text/garbage.",
-                    severity=Severity.HIGH,
-                    impact="Prevents mathematical operations and sorting.",
-                    row_count=len(df),
-                    strategies=[
-                        ResolutionStrategy(name="Convert to Numeric", description="Force conversion (text becomes NaN)",
-                                           action_code="convert_numeric"),
-                        ResolutionStrategy(name="Ignore", description="Keep as text", action_code="ignore")
-                    ]
-                ))
-
-        # 5. Text Inconsistency (Case sensitivity)
-        for col in object_cols:
-            if df[col].nunique() < 50:
-                unique_vals = df[col].dropna().unique()
-                unique_lower = set(x.lower() for x in unique_vals if isinstance(x, str))
+            # 5. Text Inconsistency (Case sensitivity)
+            # One hash pass gives both the cardinality and the values to compare; only those
+            # (fewer than 50) are lowercased, never the whole column
+            unique_vals = series.unique()
+            unique_vals = unique_vals[~pd.isna(unique_vals)]
+            if len(unique_vals) < 50:
+                unique_lower = {x.lower() for x in unique_vals if isinstance(x, str)}
 
                 if len(unique_lower) < len(unique_vals):
-                    issues.append(DetectedIssue(
-                        id=str(uuid.uuid4()),
-                        type=IssueType.TEXT_INCONSISTENCY,
-                        column=col,
-                        description=f"Column '{col}' has inconsistent text casing (e.g., 'A' vs 'a').",
-                        severity=Severity.LOW,
-                        impact="Splits identical categories into separate groups in charts.",
-                        row_count=len(df),
-                        strategies=[
-                            ResolutionStrategy(name="Standardize (Title Case)", description="Convert to 'Title Case'",
-                                               action_code="title_case"),
-                            ResolutionStrategy(name="Standardize (Lower Case)", description="Convert to 'lower case'",
-                                               action_code="lower_case"),
-                            ResolutionStrategy(name="Ignore", description="Keep as is", action_code="ignore")
-                        ]
-                    ))
+                    text_issues.append(col)
 
-        return issues
\ No newline at end of file
+        for col in text_issues:
+            issues.append(DetectedIssue.model_construct(
+                id=_new_issue_id(),
+                type=IssueType.TEXT_INCONSISTENCY,
+                column=col,
+                description=f"Column '{col}' has inconsistent text casing (e.g., 'A' vs 'a').",
+                severity=Severity.LOW,
+                impact="Splits identical categories into separate groups in charts.",
+                row_count=n,
+                strategies=list(TEXT_STRATEGIES)
+            ))
+
+        return issues
+
+    @staticmethod
+    def _outlier_counts(df: pd.DataFrame, numeric_cols: list, stats: dict) -> np.ndarray:
+        # Columns go through NumPy as float64 blocks: quartiles in one call, outliers in one reduction per block.
+        # Wide, long frames are split into column groups, so the float copy stays under OUTLIER_BLOCK_BYTES
+        cols_per_block = max(1, OUTLIER_BLOCK_BYTES // (8 * len(df)))
+        counts = []
+        for start in range(0, len(numeric_cols), cols_per_block):
+            cols = numeric_cols[start:start + cols_per_block]
+            block = df[cols].to_numpy(dtype=np.float64, na_value=np.nan)
+            q1 = np.empty(len(cols))
+            q3 = np.empty(len(cols))
+            uncached = []
+            for j, col in enumerate(cols):
+                col_stats = stats.get(col, {})
+                if "q1" in col_stats:
+                    q1[j], q3[j] = col_stats["q1"], col_stats["q3"]
+                else:
+                    uncached.append(j)
+            if uncached:
+                q1[uncached], q3[uncached] = column_quartiles(block[:, uncached])
+                for j in uncached:
+                    col = cols[j]
+                    stats[col] = {**stats.get(col, {}), "q1": float(q1[j]), "q3": float(q3[j])}
+            iqr = q3 - q1
+            counts.append(count_outliers(block, q1 - 1.5 * iqr, q3 + 1.5 * iqr))
+        return np.concatenate(counts)
+
+    @staticmethod
+    def _sample_looks_numeric(series: pd.Series) -> bool:
+        positions = np.linspace(0, len(series) - 1, min(len(series), NUMERIC_SAMPLE_SIZE)).astype(np.int64)
+        sample = series.iloc[positions].dropna()
+        hits = sum(1 for value in sample if NUMERIC_RE.match(str(value).strip()))
+        return hits >= NUMERIC_SAMPLE_MIN_SHARE * len(sample)
@@ -1,39 +1,87 @@
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
+from collections import deque
+import asyncio
+import threading
 import pandas as pd
 import uuid
 
+# Most recent audit entries kept per session; older ones are dropped as new ones arrive
+AUDIT_LOG_MAX_ENTRIES = 10_000
+
 # In-memory storage for demonstration purposes.
 # In production, replace this with Redis or a database.
 class SessionStore:
     def __init__(self):
         self._sessions: Dict[str, Dict[str, Any]] = {}
+        # session_id -> (frame, issues found in it); lets an unchanged frame skip re-profiling
+        self._profile_cache: Dict[str, Tuple[pd.DataFrame, list]] = {}
+        # Guards every mutation, so calls from threadpool workers cannot interleave with the event loop's
+        self._lock = threading.RLock()
 
     def create_session(self, df: pd.DataFrame, filename: str) -> str:
         session_id = str(uuid.uuid4())
-        self._sessions[session_id] = {
-            "original_df": df,
-            "current_df": df.copy(),
-            "filename": filename,
-            "issues": {},  # Map issue_id to issue object
-            "audit_log": []
-        }
+        with self._lock:
+            self._sessions[session_id] = {
+                "original_df": df,
+                # Shared, not copied: frames are never modified in place (Copy-on-Write), cleans produce new frames
+                "current_df": df,
+                "filename": filename,
+                "issues": {},  # Map issue_id to issue object
+                "stats": {},  # Per-column statistics of current_df (quartiles, fill values)
+                "profile_version": 0,  # Bumped each time a profile of current_df is saved
+                "profile_ready": asyncio.Event(),  # Set (and replaced) when a new profile version lands
+                "audit_log": deque(maxlen=AUDIT_LOG_MAX_ENTRIES)
+            }
         return session_id
 
     def get_session(self, session_id: str):
         return self._sessions.get(session_id)
 
-    def update_dataframe(self, session_id: str, new_df: pd.DataFrame):
-        if session_id in self._sessions:
-            self._sessions[session_id]["current_df"] = new_df
+    def update_dataframe(self, session_id: str, new_df: pd.DataFrame, stats: dict | None = None):
+        with self._lock:
+            if session_id in self._sessions:
+                session = self._sessions[session_id]
+                session["current_df"] = new_df
+                # Statistics of the previous frame only carry over when the caller vouches for them
+                session["stats"] = {} if stats is None else stats
+                cached = self._profile_cache.get(session_id)
+                if cached is not None and cached[0] is not new_df:
+                    del self._profile_cache[session_id]
+
+    def cached_profile(self, session_id: str, df: pd.DataFrame) -> list | None:
+        with self._lock:
+            cached = self._profile_cache.get(session_id)
+            if cached is not None and cached[0] is df:
+                return cached[1]
+            return None
+
+    def save_stats(self, session_id: str, stats: dict):
+        with self._lock:
+            if session_id in self._sessions:
+                self._sessions[session_id]["stats"] = stats
 
     def save_issues(self, session_id: str, issues: list):
-        if session_id in self._sessions:
-            # Index by ID for quick lookup during resolution
-            self._sessions[session_id]["issues"] = {i.id: i for i in issues}
+        with self._lock:
+            if session_id in self._sessions:
+                session = self._sessions[session_id]
+                # Index by ID for quick lookup during resolution
+                session["issues"] = {i.id: i for i in issues}
+                # Saved issues always describe the session's current frame
+                self._profile_cache[session_id] = (session["current_df"], issues)
+                session["profile_version"] += 1
+                # Wake long-polling readers, then arm a fresh event for the next version
+                session["profile_ready"].set()
+                session["profile_ready"] = asyncio.Event()
 
     def log_action(self, session_id: str, action: str):
-        if session_id in self._sessions:
-            self._sessions[session_id]["audit_log"].append(action)
+        with self._lock:
+            if session_id in self._sessions:
+                self._sessions[session_id]["audit_log"].append(action)
+
+    def log_actions(self, session_id: str, actions: list):
+        with self._lock:
+            if session_id in self._sessions:
+                self._sessions[session_id]["audit_log"].extend(actions)
 
 # Global instance
 store = SessionStore()
\ No newline at end of file